@@ -0,0 +1,146 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from process import (REQUIRED_COLS, load_sales_data, preprocess_data, aggregate_sales_by_category,
+                     get_top_n_products, sketch_sales_files)
+
+
+# Генерируем синтетические продажи в том же виде, что возвращает preprocess_data
+def generate_sales_data(rows, articles, departments, seed=0):
+    rng = np.random.default_rng(seed)
+    # Популярность товаров распределена по закону Ципфа, как в реальных каталогах
+    article_ids = rng.zipf(1.3, rows) % articles
+    quantity = rng.integers(1, 20, rows)
+    price = rng.uniform(10, 1000, articles).round(2)[article_ids]
+    return pd.DataFrame({
+        'Дата': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'Артикул': article_ids,
+        'Название товара': 'Товар ' + pd.Series(article_ids).astype(str),
+        'Отдел товара': 'Отдел ' + pd.Series(article_ids % departments).astype(str),
+        'Количество упаковок, шт.': quantity,
+        'Операция': 'Продажа',
+        'Цена руб./шт.': price,
+        'Сумма операции': quantity * price
+    })
+
+
+
+# Время выполнения и пиковая память. Память меряем отдельным запуском, чтобы tracemalloc не искажал время
+def measure(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+
+def print_timings(exact_time, exact_memory, approx_time, approx_memory):
+    print(f"  точно: {exact_time:.3f} с, {exact_memory:.1f} МБ; "
+          f"приблизительно: {approx_time:.3f} с, {approx_memory:.1f} МБ")
+
+
+
+def run_benchmark(rows, articles, departments, n, unique_error, top_error):
+    data = generate_sales_data(rows, articles, departments)
+    print(f"Строк: {rows}, артикулов: {articles}, отделов: {departments}")
+    print("=" * 40)
+
+    # Уникальные товары по отделам: точный nunique против HyperLogLog
+    exact, exact_time, exact_memory = measure(aggregate_sales_by_category, data)
+    approx, approx_time, approx_memory = measure(aggregate_sales_by_category, data, approx=True, error=unique_error)
+    relative = (approx['Уникальных товаров'] - exact['Уникальных товаров']).abs() / exact['Уникальных товаров']
+    print(f"Уникальные товары (ошибка {unique_error:.2%}):")
+    print_timings(exact_time, exact_memory, approx_time, approx_memory)
+    print(f"  средняя ошибка: {relative.mean():.2%}, максимальная: {relative.max():.2%}")
+
+    # Топ товаров: полная группировка против Space-Saving
+    for metric in ('quantity', 'revenue'):
+        exact, exact_time, exact_memory = measure(get_top_n_products, data, n, metric)
+        approx, approx_time, approx_memory = measure(get_top_n_products, data, n, metric, approx=True, error=top_error)
+        column = exact.columns[1]
+        print(f"Топ-{n} по {metric} (ошибка {top_error:.2%}):")
+        print_timings(exact_time, exact_memory, approx_time, approx_memory)
+        print_top_accuracy(exact, approx, column, data[column.removeprefix('Сумма_')].sum())
+
+
+
+def print_top_accuracy(exact, approx, column, total):
+    recall = len(set(exact['Название товара']) & set(approx['Название товара'])) / len(exact)
+    merged = exact.merge(approx, on='Название товара', suffixes=('', '_approx'))
+    overestimate = (merged[f'{column}_approx'] - merged[column]).max() / total
+    print(f"  совпадение топа: {recall:.0%}, максимальное завышение: {overestimate:.4%} от общего веса")
+
+
+
+# Точный путь: каждый файл загружается целиком, затем всё склеивается и агрегируется
+def exact_files(file_paths, n):
+    data = pd.concat([preprocess_data(load_sales_data(file_path), verbose=False) for file_path in file_paths])
+    return aggregate_sales_by_category(data), get_top_n_products(data, n)
+
+
+
+# Приблизительный путь: файлы читаются по частям, скетчи частей и файлов объединяются
+def approx_files(file_paths, n, unique_error, top_error, chunksize):
+    unique_sketches, top_sketch = sketch_sales_files(file_paths, 'quantity', unique_error, top_error, chunksize)
+    unique = pd.Series({department: sketch.count() for department, sketch in unique_sketches.items()})
+    top = top_sketch.top(n)
+    return unique, pd.DataFrame({'Название товара': top['key'], 'Сумма_Количество упаковок, шт.': top['count']})
+
+
+
+def run_files_benchmark(rows, articles, departments, n, unique_error, top_error, files, chunksize):
+    print("=" * 40)
+    print(f"Файлов: {files}, по {rows // files} строк, чтение частями по {chunksize} строк")
+    data = generate_sales_data(rows, articles, departments)
+    # В файлах дата хранится в том же виде, что и в исходных выгрузках
+    data['Дата'] = data['Дата'].dt.strftime('%d.%m.%Y')
+    data['ID операции'] = np.arange(len(data))
+    data['Адрес магазина'] = 'Адрес'
+    data['Район магазина'] = 'Район'
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_paths = []
+        for i, part in enumerate(np.array_split(np.arange(len(data)), files)):
+            file_path = os.path.join(directory, f'sales_{i}.csv')
+            data.iloc[part][REQUIRED_COLS].to_csv(file_path, sep=';', index=False)
+            file_paths.append(file_path)
+
+        (exact_unique, exact_top), exact_time, exact_memory = measure(exact_files, file_paths, n)
+        (approx_unique, approx_top), approx_time, approx_memory = measure(
+            approx_files, file_paths, n, unique_error, top_error, chunksize)
+
+    exact_unique = exact_unique['Уникальных товаров']
+    relative = (approx_unique[exact_unique.index] - exact_unique).abs() / exact_unique
+    print(f"Уникальные товары и топ-{n} по количеству:")
+    print_timings(exact_time, exact_memory, approx_time, approx_memory)
+    print(f"  уникальные товары: средняя ошибка {relative.mean():.2%}, максимальная {relative.max():.2%}")
+    print_top_accuracy(exact_top, approx_top, 'Сумма_Количество упаковок, шт.',
+                       data['Количество упаковок, шт.'].sum())
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Сравнение точного и приблизительного режимов аналитики")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--articles', type=int, default=200_000)
+    parser.add_argument('--departments', type=int, default=20)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--unique-error', type=float, default=0.01)
+    parser.add_argument('--top-error', type=float, default=0.001)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--chunksize', type=int, default=20_000)
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.articles, args.departments, args.top, args.unique_error, args.top_error)
+    run_files_benchmark(args.rows, args.articles, args.departments, args.top, args.unique_error, args.top_error,
+                        args.files, args.chunksize)
@@ -0,0 +1,2 @@
+# Корневой conftest: pytest добавляет эту папку в sys.path, поэтому тесты импортируют модули проекта
+# (process, sketches, export) и при запуске просто командой pytest
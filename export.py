@@ -0,0 +1,227 @@
+import gzip
+import importlib.util
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from process import (calculate_revenue_by_period, calculate_profit_by_period, aggregate_sales_by_category,
+                     get_top_n_products, analyze_inventory_turnover, get_inventory_insights)
+
+
+# Поддерживаемые форматы и расширения файлов
+EXPORT_FORMATS = {
+    'csv': '.csv',
+    'jsonl': '.jsonl',
+    'parquet': '.parquet'
+}
+# Расширения для сжатия текстовых форматов
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    None: ''
+}
+# Кодеки, которые поддерживает запись parquet через pyarrow
+PARQUET_COMPRESSIONS = ('snappy', 'gzip', 'brotli', 'zstd', 'lz4', None)
+
+
+
+# Разбивает отчёт на пачки строк. Отчёт может быть датафреймом или уже готовым генератором пачек.
+# Всегда отдаёт хотя бы одну (возможно, пустую) пачку, чтобы в файле были заголовок или схема
+def iter_batches(report, batch_size=50_000):
+    if isinstance(report, pd.DataFrame):
+        if len(report) == 0:
+            yield report
+        for start in range(0, len(report), batch_size):
+            yield report.iloc[start:start + batch_size]
+    else:
+        empty = True
+        for batch in report:
+            empty = False
+            yield batch
+        if empty:
+            yield pd.DataFrame()
+
+
+
+def _open_text(path, compression):
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+
+def _write_csv(batches, path, compression):
+    with _open_text(path, compression) as file:
+        header = True
+        for batch in batches:
+            # Разделитель тот же, что и во входных файлах
+            batch.to_csv(file, sep=';', index=False, header=header)
+            header = False
+
+
+
+def _write_jsonl(batches, path, compression):
+    with _open_text(path, compression) as file:
+        for batch in batches:
+            if len(batch) > 0:
+                batch.to_json(file, orient='records', lines=True, force_ascii=False, date_format='iso')
+
+
+
+def _write_parquet(batches, path, compression):
+    # pyarrow нужен только для экспорта в parquet, поэтому импортируем его здесь
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                table = pa.Table.from_pandas(batch, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema, compression=compression or 'none')
+            else:
+                # Схема берётся из первой пачки, иначе типы могут разойтись (например, колонка из одних None)
+                table = pa.Table.from_pandas(batch, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+
+# Записывает один отчёт в файл, пачками, чтобы память не зависела от размера таблицы
+def export_report(report, path, fmt='csv', compression='gzip', batch_size=50_000):
+    if fmt not in EXPORT_FORMATS:
+        print(f"Неизвестный формат экспорта: {fmt}. Доступные форматы: {', '.join(EXPORT_FORMATS)}")
+        return None
+
+    batches = iter_batches(report, batch_size)
+    try:
+        if fmt == 'csv':
+            _write_csv(batches, path, compression)
+        elif fmt == 'jsonl':
+            _write_jsonl(batches, path, compression)
+        else:
+            _write_parquet(batches, path, compression)
+    except ImportError:
+        print("Для экспорта в parquet нужно установить пакет pyarrow")
+        return None
+    except (OSError, ValueError, TypeError) as error:
+        print(f"Не удалось записать файл {path}: {error}")
+        # Удаляем недописанный файл, чтобы не оставлять битый отчёт
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+    return path
+
+
+
+# Имя файла отчёта с учётом формата и сжатия (parquet сжимается внутри файла)
+def get_report_path(directory, name, fmt='csv', compression='gzip'):
+    extension = EXPORT_FORMATS[fmt]
+    if fmt != 'parquet':
+        extension += COMPRESSION_EXTENSIONS[compression]
+    return os.path.join(directory, name + extension)
+
+
+
+# Считает и записывает один элемент словаря отчётов. Отчёт может быть таблицей, функцией без аргументов,
+# которая строит таблицу только в момент записи, или функцией, возвращающей словарь {название: таблица}
+def export_lazy_report(name, report, directory, fmt='csv', compression='gzip', batch_size=50_000):
+    if callable(report):
+        report = report()
+    if report is None:
+        return {}
+    tables = report if isinstance(report, dict) else {name: report}
+
+    paths = {}
+    for table_name, table in tables.items():
+        path = export_report(table, get_report_path(directory, table_name, fmt, compression), fmt, compression, batch_size)
+        if path is not None:
+            paths[table_name] = path
+    return paths
+
+
+
+# Экспортирует словарь {название отчёта: отчёт} в папку. workers > 1 - запись нескольких отчётов одновременно.
+# Ленивые отчёты считаются прямо перед записью, поэтому в памяти одновременно не больше workers отчётов
+def export_reports(reports, directory, fmt='csv', compression='gzip', batch_size=50_000, workers=1):
+    if fmt not in EXPORT_FORMATS:
+        print(f"Неизвестный формат экспорта: {fmt}. Доступные форматы: {', '.join(EXPORT_FORMATS)}")
+        return {}
+    allowed_compressions = PARQUET_COMPRESSIONS if fmt == 'parquet' else COMPRESSION_EXTENSIONS
+    if compression not in allowed_compressions:
+        print(f"Неизвестный тип сжатия для {fmt}: {compression}")
+        return {}
+    if fmt == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        print("Для экспорта в parquet нужно установить пакет pyarrow")
+        return {}
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as error:
+        print(f"Не удалось создать папку для отчётов {directory}: {error}")
+        return {}
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(export_lazy_report, name, report, directory, fmt, compression, batch_size)
+                       for name, report in reports.items()]
+            results = [future.result() for future in futures]
+    else:
+        results = [export_lazy_report(name, report, directory, fmt, compression, batch_size)
+                   for name, report in reports.items()]
+
+    # Возвращаем только успешно записанные файлы
+    saved = {}
+    for paths in results:
+        saved.update(paths)
+    return saved
+
+
+
+# Переводит результат get_inventory_insights в набор таблиц для экспорта
+def insights_to_reports(insights, prefix='inventory'):
+    reports = {}
+    for key, value in insights.items():
+        if key == 'summary_stats':
+            reports[f'{prefix}_{key}'] = pd.DataFrame([value])
+        else:
+            reports[f'{prefix}_{key}'] = value
+    return reports
+
+
+
+# Отчёты по движению товаров: весь каталог или рейтинги внутри отделов/магазинов
+def build_inventory_reports(data_clean, top_n=10, group=None, prefix='inventory'):
+    if group is None:
+        # inventory_classified - это весь каталог движения товаров с признаками классификации,
+        # поэтому саму таблицу analyze_inventory_turnover отдельно не выгружаем
+        inventory_analysis = analyze_inventory_turnover(data_clean, top_n=None)
+        return insights_to_reports(get_inventory_insights(inventory_analysis, top_n), prefix)
+
+    grouped_analysis = analyze_inventory_turnover(data_clean, top_n=None, group_by=[group])
+    grouped_insights = get_inventory_insights(grouped_analysis, top_n, group_by=[group])
+    # Полный классифицированный каталог выгружается без группировки, по группам хватает рейтингов и сводки
+    del grouped_insights['classified']
+    return insights_to_reports(grouped_insights, prefix)
+
+
+
+# Собирает все отчёты программы. Движение товаров выгружается по всему каталогу, а не только топ.
+# Отчёты не считаются сразу: каждый строится только тогда, когда до него доходит запись
+def build_reports(data_clean, period='D', top_n=10):
+    return {
+        'revenue_by_period': lambda: calculate_revenue_by_period(data_clean, period),
+        'profit_by_period': lambda: calculate_profit_by_period(data_clean, period),
+        'sales_by_category': lambda: aggregate_sales_by_category(data_clean).reset_index(),
+        'top_products_quantity': lambda: get_top_n_products(data_clean, top_n, 'quantity'),
+        'top_products_revenue': lambda: get_top_n_products(data_clean, top_n, 'revenue'),
+        'inventory': lambda: build_inventory_reports(data_clean, top_n),
+        # Рейтинги внутри отделов и магазинов
+        'inventory_by_department': lambda: build_inventory_reports(
+            data_clean, top_n, 'Отдел товара', 'inventory_by_department'),
+        'inventory_by_store': lambda: build_inventory_reports(
+            data_clean, top_n, 'Адрес магазина', 'inventory_by_store'),
+    }
@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
+from export import build_reports, export_reports
 from process import load_sales_data, preprocess_data, calculate_profit_by_period, aggregate_sales_by_category, get_top_n_products, calculate_revenue_by_period, get_inventory_insights, analyze_inventory_turnover
 
 def present_revenue_by_period(data, period='D'):
@@ -146,10 +147,10 @@ def present_top_n_products(data, n, metric, date):
     plt.show()
 
 
-# Выводит отчет по движению товаров
+# Выводит отчет по движению товаров. Анализ идёт по всему каталогу, top_n - сколько товаров показать в каждом разделе
 def print_inventory_report(data, top_n):
-    inventory_analysis = analyze_inventory_turnover(data, top_n)
-    insights = get_inventory_insights(inventory_analysis)
+    inventory_analysis = analyze_inventory_turnover(data, top_n=None)
+    insights = get_inventory_insights(inventory_analysis, top_n)
 
     print("=" * 40)
     print("АНАЛИЗ ДВИЖЕНИЯ ТОВАРОВ И ИХ РЕНТАБЕЛЬНОСТИ")
@@ -165,11 +166,12 @@ def print_inventory_report(data, top_n):
     print(f"Средняя рентабельность: {stats['avg_profitability']:.2f}%")
     print(f"Товаров с возможным дефицитом: {stats['items_with_deficit']}")
     print(f"Товаров с возможным излишком: {stats['items_with_excess']}")
+    print(f"Прибыльных товаров: {stats['profitable_items']}, убыточных: {stats['loss_making_items']}")
     
     print("\n ТОВАРЫ С ВОЗМОЖНЫМ ДЕФИЦИТОМ (продажи > поступления):")
     print("-" * 40)
-    if insights['overstock_candidates']:
-        for item in insights['overstock_candidates'][:5]:  # Показываем первые 5
+    if len(insights['overstock_candidates']) > 0:
+        for _, item in insights['overstock_candidates'].head(top_n).iterrows():  # Показываем первые top_n
             print(f"• {item['Название товара']} ({item['Артикул']})")
             print(f"  Продано: {item['Продано_упаковок']} уп., Поступило: {item['Поступлено_упаковок']} уп.")
             print(f"  Разница: +{item['Разница_упаковок']} уп. (дефицит)")
@@ -178,8 +180,8 @@ def print_inventory_report(data, top_n):
     
     print("\n ТОВАРЫ С ВОЗМОЖНЫМ ИЗЛИШКОМ (поступления > продаж):")
     print("-" * 40)
-    if insights['understock_candidates']:
-        for item in insights['understock_candidates'][:5]:  # Показываем первые 5
+    if len(insights['understock_candidates']) > 0:
+        for _, item in insights['understock_candidates'].head(top_n).iterrows():  # Показываем первые top_n
             print(f"• {item['Название товара']} ({item['Артикул']})")
             print(f"  Продано: {item['Продано_упаковок']} уп., Поступило: {item['Поступлено_упаковок']} уп.")
             print(f"  Разница: {item['Разница_упаковок']} уп. (излишек)")
@@ -188,14 +190,14 @@ def print_inventory_report(data, top_n):
     
     print("\n САМЫЕ ПРИБЫЛЬНЫЕ ТОВАРЫ:")
     print("-" * 40)
-    for item in insights['most_profitable']:
+    for _, item in insights['most_profitable'].iterrows():
         print(f"• {item['Название товара']} ({item['Артикул']})")
         print(f"  Прибыль: {item['Прибыль']:,.2f} руб. | "
               f"Рентабельность: {item['Рентабельность_%']}%")
     
     print("\n НАИМЕНЕЕ ПРИБЫЛЬНЫЕ ТОВАРЫ:")
     print("-" * 40)
-    for item in insights['least_profitable']:
+    for _, item in insights['least_profitable'].iterrows():
         profitability = item['Рентабельность_%']
         profit_status = f"Прибыль: {item['Прибыль']:,.2f} руб." if item['Прибыль'] >= 0 else f"Убыток: {item['Прибыль']:,.2f} руб."
         print(f"• {item['Название товара']} ({item['Артикул']})")
@@ -233,9 +235,10 @@ def get_user_request():
             print("3. Сгруппировать продажи по отделам.")
             print("4. Получить топ самых продаваемых товаров.")
             print("5. Проанализировать движение товаров.")
+            print("6. Экспортировать отчёты в файлы.")
             print('=' * 40)
             user_request = input("Введите число, соответствующее выбранной функции: ")
-            if user_request in [str(x) for x in range(1, 6)]:
+            if user_request in [str(x) for x in range(1, 7)]:
                 print()
                 break
             else:
@@ -344,6 +347,28 @@ def get_user_request():
 
             print_inventory_report(data_clean, n)
 
+        if user_request == '6':
+            while True:
+                available_formats = {
+                    '1' : 'csv',
+                    '2' : 'jsonl',
+                    '3' : 'parquet'
+                }
+                s = input("В каком формате сохранить отчёты: CSV (1), JSON Lines (2) или Parquet (3)? --- ")
+                if s in available_formats.keys():
+                    fmt = available_formats[s]
+                    break
+                else:
+                    print("Что-то пошло не так, попробуйте еще раз.")
+
+            directory = input("Введите папку для сохранения отчётов (по умолчанию reports): ").strip() or "reports"
+
+            print("\nСчитаю отчёты и сохраняю их...")
+            saved = export_reports(build_reports(data_clean), directory, fmt, workers=4)
+            for name, path in saved.items():
+                print(f"• {name}: {path}")
+            print(f"Сохранено отчётов: {len(saved)}")
+
 
         # после выполнения действия спрашиваем, хочет ли пользователь продолжить работу с программой
         print()
@@ -1,8 +1,18 @@
+import math
+
 import pandas as pd
 
+from sketches import SpaceSaving, group_hyperloglogs, merge_sketch_maps
 
-def load_sales_data(file_path):
-    REQUIRED_COLS = [
+
+# Колонки, по которым составляется топ товаров для каждой метрики
+TOP_METRIC_COLUMNS = {
+    'quantity': 'Количество упаковок, шт.',
+    'revenue': 'Сумма операции'
+}
+
+
+REQUIRED_COLS = [
     "ID операции",
     "Дата",
     "Адрес магазина",
@@ -13,7 +23,21 @@ def load_sales_data(file_path):
     "Количество упаковок, шт.",
     "Операция",
     "Цена руб./шт."
-    ]
+]
+
+
+
+# Проверяет, что в таблице есть все обязательные столбцы, и сообщает о недостающих
+def check_required_columns(data, file_path):
+    missing = [col for col in REQUIRED_COLS if col not in data.columns]
+    if missing:
+        print(f"Не удалось прочесть файл: {file_path}. Отсутстуют обязательные столбцы: {', '.join(missing)}")
+        return False
+    return True
+
+
+
+def load_sales_data(file_path):
     # Перехватываем любую ошибку чтения файла, чтобы пользователь не видел огромный трейсбек.
     # Вместо этого выводим одно понятное сообщение и завершаем функцию.
     try:
@@ -27,16 +51,14 @@ def load_sales_data(file_path):
 
     # После чтения файла проверяем структуру таблицы, если столбцы не совпадают с ожидаемыми,
     # то это значит, что файл не подходит.
-    missing = [col for col in REQUIRED_COLS if col not in data.columns]
-    if missing:
-        print(f"Не удалось прочесть файл: {file_path}. Отсутстуют обязательные столбцы: {', '.join(missing)}")
+    if not check_required_columns(data, file_path):
         return None
 
     return data
 
 
 
-def preprocess_data(data):
+def preprocess_data(data, verbose=True):
     # Если на вход пришёл None, то ничего не делаем, чтобы программа не падала
     if data is None:
         return None
@@ -69,7 +91,7 @@ def preprocess_data(data):
     data_clean = data_clean.dropna()
     removed = before - len(data_clean)
 
-    if removed > 0:
+    if removed > 0 and verbose:
         print(f"Удалено строк с пустыми значениями: {removed}")
 
     # Считаем сумму операции
@@ -160,7 +182,9 @@ def calculate_profit_by_period(data_clean, period='D'):
 
 
 
-def aggregate_sales_by_category(data_clean):
+# approx=True считает уникальные товары через HyperLogLog. На уже загруженной таблице это не быстрее
+# и не экономнее точного nunique: выигрыш по памяти даёт только sketch_sales_files при чтении файлов частями
+def aggregate_sales_by_category(data_clean, approx=False, error=0.01):
     # Фильтруем продажи (если есть колонка операции)
     sales_data = get_operational_data(data_clean, operation_type="Продажа")
     
@@ -170,10 +194,16 @@ def aggregate_sales_by_category(data_clean):
         agg_dict['Выручка'] = ('Сумма операции', 'sum')
     if 'Количество упаковок, шт.' in sales_data.columns:
         agg_dict['Проданных единиц'] = ('Количество упаковок, шт.', 'sum')
-    if 'Артикул' in sales_data.columns:
+    if 'Артикул' in sales_data.columns and not approx:
         agg_dict['Уникальных товаров'] = ('Артикул', 'nunique')
     
     sales_by_category = sales_data.groupby('Отдел товара').agg(**agg_dict)
+
+    # В приблизительном режиме уникальные артикулы считаем через HyperLogLog
+    if 'Артикул' in sales_data.columns and approx:
+        sketches = sketch_unique_products(sales_data, error)
+        sales_by_category['Уникальных товаров'] = pd.Series(
+            {department: sketch.count() for department, sketch in sketches.items()})
     
     # Сортируем по алфавиту
     category_stats = sales_by_category.sort_index()
@@ -182,7 +212,9 @@ def aggregate_sales_by_category(data_clean):
 
 
 
-def get_top_n_products(data_clean, n=5, metric='quantity', date='all'):
+# approx=True строит топ через Space-Saving. Как и в aggregate_sales_by_category, на загруженной таблице
+# это не экономит память; сводка нужна для объединения частей и файлов в sketch_sales_files
+def get_top_n_products(data_clean, n=5, metric='quantity', date='all', approx=False, error=0.001):
     # Оставляем только операции продажи
     sales_data = get_operational_data(data_clean, "Продажа")
 
@@ -201,6 +233,12 @@ def get_top_n_products(data_clean, n=5, metric='quantity', date='all'):
         agg_func = 'sum'
     else:
         return None
+
+    # В приблизительном режиме храним только ограниченное число счётчиков (Space-Saving)
+    if approx:
+        sketch = sketch_top_products(sales_data, metric, error, capacity=max(math.ceil(1 / error), n))
+        top = sketch.top(n)
+        return pd.DataFrame({'Название товара': top['key'], result_column: top['count']})
         
     # Группируем все записи для одинаковых названия товаров в одну строчку - сумма по товару, считаю сумму всех операций
     grouped_data = sales_data.groupby('Название товара', as_index=False).agg({agg_column: agg_func}).rename(columns={agg_column: result_column})
@@ -211,13 +249,91 @@ def get_top_n_products(data_clean, n=5, metric='quantity', date='all'):
 
 
 
-def analyze_inventory_turnover(data_clean, top_n=10):
+# Скетчи уникальных артикулов по отделам. Можно передать уже накопленные скетчи
+# (например, с предыдущего чанка или файла) - они будут дополнены
+def sketch_unique_products(sales_data, error=0.01, sketches=None):
+    return group_hyperloglogs(sales_data['Отдел товара'], sales_data['Артикул'], error, sketches)
+
+
+
+# Скетч самых продаваемых товаров по количеству или выручке, обрабатываем данные пачками
+def sketch_top_products(sales_data, metric='quantity', error=0.001, sketch=None, capacity=None, chunksize=100_000):
+    if sketch is None:
+        sketch = SpaceSaving(error, capacity)
+    agg_column = TOP_METRIC_COLUMNS[metric]
+    for start in range(0, len(sales_data), chunksize):
+        chunk = sales_data.iloc[start:start + chunksize]
+        sketch.update(chunk['Название товара'], chunk[agg_column])
+    return sketch
+
+
+
+# Определяет кодировку файла, читая его блоками, чтобы не загружать файл в память целиком
+def detect_encoding(file_path, block_size=1 << 20):
+    for encoding in ("utf-8", "cp1251"):
+        try:
+            with open(file_path, encoding=encoding) as file:
+                while file.read(block_size):
+                    pass
+            return encoding
+        except UnicodeDecodeError:
+            continue
+        except OSError:
+            return None
+    return None
+
+
+
+# Строит скетчи сразу по нескольким файлам, читая их по частям, чтобы память не росла с размером каталога
+def sketch_sales_files(file_paths, metric='quantity', unique_error=0.01, top_error=0.001, chunksize=100_000):
+    unique_sketches = {}
+    top_sketch = SpaceSaving(top_error)
+    for file_path in file_paths:
+        encoding = detect_encoding(file_path)
+        if encoding is None:
+            print(f"Не удалось прочесть файл, проверьте кодировку и разделитель: {file_path}")
+            continue
+
+        # Пустой файл или нечитаемый заголовок обнаруживаются уже при создании читателя
+        try:
+            chunks = pd.read_csv(file_path, sep=";", encoding=encoding, chunksize=chunksize)
+        except Exception:
+            print(f"Не удалось прочесть файл, проверьте кодировку и разделитель: {file_path}")
+            continue
+        removed = 0
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            except Exception as error:
+                # Повреждённый фрагмент: то, что уже прочитано, остаётся в скетчах
+                print(f"Не удалось дочитать файл {file_path}: {error}")
+                break
+            if not check_required_columns(chunk, file_path):
+                break
+
+            data_clean = preprocess_data(chunk, verbose=False)
+            removed += len(chunk) - len(data_clean)
+            sales_data = get_operational_data(data_clean, operation_type="Продажа")
+            merge_sketch_maps(unique_sketches, sketch_unique_products(sales_data, unique_error))
+            sketch_top_products(sales_data, metric, sketch=top_sketch, chunksize=chunksize)
+
+        if removed > 0:
+            print(f"Удалено строк с пустыми значениями: {removed} ({file_path})")
+    return unique_sketches, top_sketch
+
+
+
+def analyze_inventory_turnover(data_clean, top_n=10, group_by=None):
     # Сохраняем два датасета по продажам и поступлениям отдельно
     sales_data = get_operational_data(data_clean, 'Продажа')
     purchases_data = get_operational_data(data_clean, 'Поступление')
+    # Дополнительные ключи группировки, например отдел или магазин
+    keys = [*(group_by or []), 'Артикул', 'Название товара']
 
     # Группируем все продажи по одному товары по сумме количества проданных упаковок и выручке
-    sales_grouped = sales_data.groupby(['Артикул', 'Название товара']).agg({
+    sales_grouped = sales_data.groupby(keys).agg({
         'Количество упаковок, шт.': 'sum',
         'Сумма операции': 'sum'}).reset_index()
     # Переименуем столбцы для ясности
@@ -226,7 +342,7 @@ def analyze_inventory_turnover(data_clean, top_n=10):
         'Сумма операции': 'Выручка_от_продаж'})
     
     # То же самое для закупок
-    purchases_grouped = purchases_data.groupby(['Артикул', 'Название товара']).agg({
+    purchases_grouped = purchases_data.groupby(keys).agg({
         'Количество упаковок, шт.': 'sum',
         'Сумма операции': 'sum'}).reset_index()
     purchases_grouped = purchases_grouped.rename(columns={
@@ -237,7 +353,7 @@ def analyze_inventory_turnover(data_clean, top_n=10):
     inventory_analysis = pd.merge(
         sales_grouped,
         purchases_grouped,
-        on=['Артикул', 'Название товара'],
+        on=keys,
         how='outer')  # Используем outer join для отображения всех товаров
     
     # В случае, если товар был только в продажах или в поступлениях, заменяем NaN значения на 0
@@ -256,7 +372,7 @@ def analyze_inventory_turnover(data_clean, top_n=10):
     
     # Рассчитываем рентабельность (%), используем маску чтобы избежать деления на ноль
     mask = inventory_analysis['Затраты_на_закупки'] > 0
-    inventory_analysis['Рентабельность_%'] = 0
+    inventory_analysis['Рентабельность_%'] = 0.0
     inventory_analysis.loc[mask, 'Рентабельность_%'] = ((inventory_analysis.loc[mask, 'Прибыль'] / inventory_analysis.loc[mask, 'Затраты_на_закупки']) * 100)
     # Для товаров, которые были только в продажах (нет затрат на закупку в данных)
     only_sales_mask = (inventory_analysis['Продано_упаковок'] > 0) & (inventory_analysis['Затраты_на_закупки'] == 0)
@@ -279,61 +395,81 @@ def analyze_inventory_turnover(data_clean, top_n=10):
     # Форматируем рентабельность
     inventory_analysis['Рентабельность_%'] = inventory_analysis['Рентабельность_%'].round(2)
     
-    # Возвращаем top_n записей
+    # Возвращаем top_n записей (при top_n=None - весь каталог)
+    if top_n is None:
+        return inventory_analysis.reset_index(drop=True)
     return inventory_analysis.head(top_n).reset_index(drop=True)
 
 
 
-# Вспомогательная функция для анализа инвентарности
-def get_inventory_insights(inventory_analysis):
-    insights = {
-        'overstock_candidates': [],  # Возможный дефицит (продажи > поступлений)
-        'understock_candidates': [], # Возможный излишек (поступления > продаж)
-        'most_profitable': [],      # Самые прибыльные товары
-        'least_profitable': [],     # Наименее прибыльные товары
-        'summary_stats': {}          # Сводная статистика
-    }
-    
+# Вспомогательная функция для анализа инвентарности. Классифицирует весь переданный каталог
+# векторными масками и возвращает таблицы (датафреймы), а не списки словарей.
+# При group_by (например ['Отдел товара'] или ['Адрес магазина']) пороги и рейтинги считаются внутри групп,
+# а вместо summary_stats возвращается сводка по группам group_stats
+def get_inventory_insights(inventory_analysis, top_n=5, group_by=None):
+    classified = inventory_analysis.copy()
+
+    # Порог - 30% от среднего числа проданных упаковок (по всему каталогу или по группе)
+    if group_by:
+        mean_sold = classified.groupby(group_by)['Продано_упаковок'].transform('mean')
+    else:
+        mean_sold = classified['Продано_упаковок'].mean()
+    threshold = mean_sold * 0.3
+
     # Товары с большой положительной разницей (возможный дефицит), продажи значительно превышают поступления
-    overstock_threshold = inventory_analysis['Продано_упаковок'].mean() * 0.3
-    overstock_items = inventory_analysis[inventory_analysis['Разница_упаковок'] > overstock_threshold]
-    
+    classified['Дефицит'] = classified['Разница_упаковок'] > threshold
     # Товары с большой отрицательной разницей (возможный излишек), поступления значительно превышают продажи
-    understock_threshold = -inventory_analysis['Продано_упаковок'].mean() * 0.3
-    understock_items = inventory_analysis[inventory_analysis['Разница_упаковок'] < understock_threshold]
-    
-    # Самые прибыльные товары
-    most_profitable = inventory_analysis.nlargest(5, 'Прибыль')
-    # Наименее прибыльные товары 
-    least_profitable = inventory_analysis.nsmallest(5, 'Прибыль')
-    
-    # Заполняем insights
-    insights['overstock_candidates'] = overstock_items[[
-        'Артикул', 'Название товара', 'Разница_упаковок', 
-        'Продано_упаковок', 'Поступлено_упаковок'
-    ]].to_dict('records') # Преобразовывает датафрейм в список словарей
-    insights['understock_candidates'] = understock_items[[
-        'Артикул', 'Название товара', 'Разница_упаковок',
-        'Продано_упаковок', 'Поступлено_упаковок'
-    ]].to_dict('records')
-    insights['most_profitable'] = most_profitable[[
-        'Артикул', 'Название товара', 'Прибыль', 
-        'Рентабельность_%', 'Выручка_от_продаж', 'Затраты_на_закупки'
-    ]].to_dict('records')
-    insights['least_profitable'] = least_profitable[[
-        'Артикул', 'Название товара', 'Прибыль',
-        'Рентабельность_%', 'Выручка_от_продаж', 'Затраты_на_закупки'
-    ]].to_dict('records')
-    
-    # Сводная статистика
+    classified['Излишек'] = classified['Разница_упаковок'] < -threshold
+    classified['Прибыльный'] = classified['Прибыль'] > 0
+    classified['Убыточный'] = classified['Прибыль'] < 0
+
+    # Места по прибыли: 1 - самый прибыльный и, отдельно, 1 - самый убыточный
+    profit = classified.groupby(group_by)['Прибыль'] if group_by else classified['Прибыль']
+    classified['Место_по_прибыли'] = profit.rank(method='first', ascending=False).astype(int)
+    classified['Место_с_конца'] = profit.rank(method='first', ascending=True).astype(int)
+
+    difference_columns = [*(group_by or []), 'Артикул', 'Название товара', 'Разница_упаковок',
+                          'Продано_упаковок', 'Поступлено_упаковок']
+    profit_columns = [*(group_by or []), 'Артикул', 'Название товара', 'Прибыль',
+                      'Рентабельность_%', 'Выручка_от_продаж', 'Затраты_на_закупки']
+
+    # Самые прибыльные и наименее прибыльные товары (top_n на каталог или на группу)
+    most_profitable = classified[classified['Место_по_прибыли'] <= top_n]
+    most_profitable = most_profitable.sort_values([*(group_by or []), 'Место_по_прибыли'])
+    least_profitable = classified[classified['Место_с_конца'] <= top_n]
+    least_profitable = least_profitable.sort_values([*(group_by or []), 'Место_с_конца'])
+
+    insights = {
+        'overstock_candidates': classified.loc[classified['Дефицит'], difference_columns].reset_index(drop=True),  # Возможный дефицит
+        'understock_candidates': classified.loc[classified['Излишек'], difference_columns].reset_index(drop=True),  # Возможный излишек
+        'most_profitable': most_profitable[profit_columns].reset_index(drop=True),
+        'least_profitable': least_profitable[profit_columns].reset_index(drop=True),
+        'classified': classified  # Весь каталог с признаками классификации
+    }
+
+    # Сводка по группам: сколько товаров попало в каждую категорию
+    if group_by:
+        insights['group_stats'] = classified.groupby(group_by).agg(
+            Товаров=('Артикул', 'size'),
+            Выручка=('Выручка_от_продаж', 'sum'),
+            Прибыль=('Прибыль', 'sum'),
+            Дефицит=('Дефицит', 'sum'),
+            Излишек=('Излишек', 'sum'),
+            Прибыльных=('Прибыльный', 'sum'),
+            Убыточных=('Убыточный', 'sum')).reset_index()
+        return insights
+
+    # Сводная статистика по всему каталогу (для групп её заменяет group_stats)
     insights['summary_stats'] = {
-        'total_revenue': inventory_analysis['Выручка_от_продаж'].sum(),
-        'total_costs': inventory_analysis['Затраты_на_закупки'].sum(),
-        'total_profit': inventory_analysis['Прибыль'].sum(),
-        'avg_profitability': inventory_analysis['Рентабельность_%'].mean(),
-        'items_with_deficit': len(overstock_items),
-        'items_with_excess': len(understock_items),
-        'total_items': len(inventory_analysis)
+        'total_revenue': classified['Выручка_от_продаж'].sum(),
+        'total_costs': classified['Затраты_на_закупки'].sum(),
+        'total_profit': classified['Прибыль'].sum(),
+        'avg_profitability': classified['Рентабельность_%'].mean(),
+        'items_with_deficit': int(classified['Дефицит'].sum()),
+        'items_with_excess': int(classified['Излишек'].sum()),
+        'profitable_items': int(classified['Прибыльный'].sum()),
+        'loss_making_items': int(classified['Убыточный'].sum()),
+        'total_items': len(classified)
     }
     
     return insights
@@ -0,0 +1,189 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Хеширование значений в 64-битные числа. Используем хеш pandas с фиксированным ключом,
+# поэтому один и тот же артикул даёт одинаковый хеш в разных чанках, файлах и запусках
+def hash_values(values):
+    values = pd.Series(values).dropna()
+    # Хеш pandas зависит от типа колонки, поэтому приводим значения к одному виду:
+    # целые числа, записанные как float (колонка с пропуском), переводим в int64 и хешируем как числа.
+    # В строки переводим только текстовые колонки, это заметно дороже
+    if pd.api.types.is_float_dtype(values) and (values % 1 == 0).all():
+        values = values.astype(np.int64)
+    elif pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+        values = values.astype(np.int64)
+    elif not pd.api.types.is_float_dtype(values):
+        values = values.astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+
+
+# Длина двоичной записи для массива uint64 (бинарный поиск по сдвигам, без перевода во float)
+def _bit_length(values):
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= (np.uint64(1) << np.uint64(shift))
+        length[mask] += shift
+        values[mask] >>= np.uint64(shift)
+    length += (values > 0)
+    return length
+
+
+
+class HyperLogLog:
+    # Приблизительный подсчёт числа уникальных значений.
+    # Относительная ошибка примерно 1.04 / sqrt(2 ** precision), памяти - 2 ** precision байт
+    MIN_PRECISION = 4
+    MAX_PRECISION = 18
+
+    def __init__(self, error=0.01, precision=None):
+        if precision is None:
+            if error <= 0:
+                raise ValueError("Ошибка HyperLogLog должна быть положительной")
+            # Подбираем точность под желаемую ошибку, но не меньше минимальной
+            precision = max(math.ceil(math.log2((1.04 / error) ** 2)), self.MIN_PRECISION)
+        if not self.MIN_PRECISION <= precision <= self.MAX_PRECISION:
+            min_error = 1.04 / math.sqrt(2 ** self.MAX_PRECISION)
+            raise ValueError(f"Точность HyperLogLog должна быть от {self.MIN_PRECISION} до {self.MAX_PRECISION} "
+                             f"(минимально достижимая ошибка {min_error:.2%})")
+        self.precision = precision
+        self.registers = np.zeros(2 ** self.precision, dtype=np.uint8)
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    # Номер регистра и ранг (позиция первой единицы) для каждого хеша
+    def _registers_and_ranks(self, hashes):
+        p = np.uint64(self.precision)
+        # Старшие биты хеша - номер регистра, по остальным считаем позицию первой единицы
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes & ((np.uint64(1) << (np.uint64(64) - p)) - np.uint64(1))
+        rank = (64 - self.precision) - _bit_length(rest) + 1
+        return index, rank.astype(np.uint8)
+
+    def update(self, values):
+        hashes = hash_values(values)
+        if len(hashes) == 0:
+            return self
+        index, rank = self._registers_and_ranks(hashes)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("Нельзя объединить HyperLogLog с разной точностью")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        # Поправка для малых значений (линейный подсчёт по пустым регистрам)
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+
+class SpaceSaving:
+    # Поиск самых частых (тяжёлых) элементов с весами: количество упаковок или выручка.
+    # Хранит не более capacity счётчиков, оценка веса завышена не более чем на error * общий вес
+    def __init__(self, error=0.001, capacity=None):
+        if capacity is None:
+            if not 0 < error <= 1:
+                raise ValueError("Ошибка Space-Saving должна быть в диапазоне (0, 1]")
+            capacity = math.ceil(1 / error)
+        if capacity < 1:
+            raise ValueError("Число счётчиков Space-Saving должно быть положительным")
+        self.capacity = capacity
+        self.counts = {}   # Верхняя оценка веса элемента
+        self.errors = {}   # На сколько оценка может быть завышена
+        self.total = 0
+
+    # Вес, который мог быть у любого элемента, отсутствующего в сводке
+    def min_count(self):
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def update(self, keys, weights=None):
+        if weights is None:
+            weights = np.ones(len(keys))
+        # Сначала точно агрегируем пачку (она ограничена размером чанка), затем сливаем в сводку
+        batch = pd.Series(np.asarray(weights)).groupby(np.asarray(keys), sort=False).sum()
+        batch = batch.nlargest(self.capacity)
+        other = SpaceSaving(capacity=self.capacity)
+        other.counts = batch.to_dict()
+        other.errors = dict.fromkeys(other.counts, 0)
+        other.total = float(np.sum(weights))
+        return self.merge(other)
+
+    def merge(self, other):
+        self_min = self.min_count()
+        other_min = other.min_count()
+        counts = {}
+        errors = {}
+        # Для элемента, которого нет в одной из сводок, добавляем её минимальный счётчик
+        for key in self.counts.keys() | other.counts.keys():
+            counts[key] = self.counts.get(key, self_min) + other.counts.get(key, other_min)
+            errors[key] = self.errors.get(key, self_min) + other.errors.get(key, other_min)
+        # Оставляем capacity самых больших счётчиков
+        top = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {key: counts[key] for key in top}
+        self.errors = {key: errors[key] for key in top}
+        self.total += other.total
+        return self
+
+    def top(self, n):
+        keys = sorted(self.counts, key=self.counts.get, reverse=True)[:n]
+        return pd.DataFrame({
+            'key': keys,
+            'count': [self.counts[key] for key in keys],
+            'error': [self.errors[key] for key in keys]})
+
+
+
+# Скетчи HyperLogLog для каждой группы (например, отдела) за один проход по колонке:
+# значения хешируются один раз, а максимумы рангов по регистрам считаются группировкой
+def group_hyperloglogs(groups, values, error=0.01, sketches=None):
+    if sketches is None:
+        sketches = {}
+    groups = pd.Series(groups).reset_index(drop=True)
+    values = pd.Series(values).reset_index(drop=True)
+    known = values.notna() & groups.notna()
+    groups, values = groups[known], values[known]
+    if len(values) == 0:
+        return sketches
+
+    template = HyperLogLog(error)
+    codes, uniques = pd.factorize(groups)
+    index, rank = template._registers_and_ranks(hash_values(values))
+    # Максимальный ранг для каждой пары (группа, регистр)
+    registers_count = len(template.registers)
+    best = pd.Series(rank).groupby(codes.astype(np.int64) * registers_count + index, sort=False).max()
+    group_codes, register_index = np.divmod(best.index.to_numpy(), registers_count)
+    for code, group in enumerate(uniques):
+        if group not in sketches:
+            sketches[group] = HyperLogLog(error)
+        mask = group_codes == code
+        registers = sketches[group].registers
+        registers[register_index[mask]] = np.maximum(registers[register_index[mask]], best.to_numpy()[mask])
+    return sketches
+
+
+
+# Объединение словарей {группа: скетч}, например скетчей по отделам из разных файлов
+def merge_sketch_maps(target, other):
+    for key, sketch in other.items():
+        if key in target:
+            target[key].merge(sketch)
+        else:
+            target[key] = sketch
+    return target
@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from export import export_report, export_reports
+
+
+def test_parquet_export_keeps_first_batch_schema(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "report.parquet"
+    # Во второй пачке колонка состоит только из None
+    report = pd.DataFrame({"Название товара": ["a", "b", None, None], "Продано": [1, 2, 3, 4]})
+
+    assert export_report(report, path, "parquet", batch_size=2) == path
+    assert pd.read_parquet(path)["Продано"].tolist() == [1, 2, 3, 4]
+
+
+def test_failed_parquet_export_removes_partial_file(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "report.parquet"
+    report = pd.DataFrame({"Артикул": [1, 2, "x", "y"]})
+
+    assert export_report(report, path, "parquet", batch_size=2) is None
+    assert not path.exists()
+
+
+def test_csv_export_streams_batches(tmp_path):
+    path = tmp_path / "report.csv.gz"
+    report = pd.DataFrame({"Артикул": range(10), "Прибыль": [0.5] * 10})
+
+    export_report(report, path, "csv", batch_size=3)
+    assert pd.read_csv(path, sep=";").equals(report)
+
+
+def test_empty_report_still_writes_file(tmp_path):
+    report = pd.DataFrame({"Артикул": pd.Series([], dtype="int64")})
+
+    csv_path = tmp_path / "empty.csv"
+    assert export_report(report, csv_path, "csv", compression=None) == csv_path
+    assert csv_path.read_text(encoding="utf-8").strip() == "Артикул"
+
+    jsonl_path = tmp_path / "empty.jsonl"
+    assert export_report(iter([]), jsonl_path, "jsonl", compression=None) == jsonl_path
+    assert jsonl_path.exists()
+
+
+def test_empty_parquet_report_keeps_schema(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "empty.parquet"
+    report = pd.DataFrame({"Артикул": pd.Series([], dtype="int64")})
+
+    assert export_report(report, path, "parquet") == path
+    assert pd.read_parquet(path).columns.tolist() == ["Артикул"]
+
+
+def test_export_reports_rejects_unknown_parquet_codec(tmp_path, capsys):
+    reports = {"report": pd.DataFrame({"a": [1]})}
+
+    assert export_reports(reports, tmp_path, "parquet", compression="bogus") == {}
+    assert "bogus" in capsys.readouterr().out
+
+
+def test_export_reports_reports_directory_error(tmp_path, capsys):
+    not_a_directory = tmp_path / "file"
+    not_a_directory.write_text("")
+
+    assert export_reports({"report": pd.DataFrame({"a": [1]})}, not_a_directory) == {}
+    assert "Не удалось создать папку" in capsys.readouterr().out
+
+
+def test_lazy_reports_are_built_only_when_exported(tmp_path):
+    built = []
+
+    def report():
+        built.append("report")
+        return {"first": pd.DataFrame({"a": [1]}), "second": pd.DataFrame({"b": [2]})}
+
+    reports = {"group": report}
+    assert built == []
+    saved = export_reports(reports, tmp_path, "csv", compression=None)
+    assert built == ["report"]
+    assert sorted(saved) == ["first", "second"]
@@ -0,0 +1,168 @@
+import pandas as pd
+
+from benchmark import generate_sales_data
+from export import build_reports, export_reports
+from process import (REQUIRED_COLS, aggregate_sales_by_category, analyze_inventory_turnover, get_inventory_insights,
+                     get_top_n_products, preprocess_data, sketch_sales_files)
+
+
+def make_sales(articles):
+    return pd.DataFrame({
+        "ID операции": range(len(articles)),
+        "Дата": "01.01.2024",
+        "Адрес магазина": "Адрес",
+        "Район магазина": "Район",
+        "Артикул": articles,
+        "Название товара": ["Товар " + str(article) for article in articles],
+        "Отдел товара": "Отдел",
+        "Количество упаковок, шт.": 1,
+        "Операция": "Продажа",
+        "Цена руб./шт.": "10,5",
+    })[REQUIRED_COLS]
+
+
+def test_sketch_sales_files_merges_int_and_float_articles(tmp_path, capsys):
+    first = tmp_path / "first.csv"
+    second = tmp_path / "second.csv"
+    make_sales(list(range(500))).to_csv(first, sep=";", index=False)
+    # Пустой артикул делает колонку float64 во втором файле
+    make_sales([*range(500), None]).to_csv(second, sep=";", index=False, encoding="cp1251")
+
+    unique_sketches, top_sketch = sketch_sales_files([first, second], chunksize=120)
+    assert abs(unique_sketches["Отдел"].count() - 500) <= 15
+    assert top_sketch.total == 1000
+    assert capsys.readouterr().out.count("Удалено строк") == 1
+
+
+def test_sketch_sales_files_skips_file_without_required_columns(tmp_path, capsys):
+    broken = tmp_path / "broken.csv"
+    make_sales([1, 2, 3]).drop(columns="Операция").to_csv(broken, sep=";", index=False)
+
+    unique_sketches, top_sketch = sketch_sales_files([broken])
+    assert unique_sketches == {}
+    assert "Операция" in capsys.readouterr().out
+
+
+def make_inventory():
+    sales = make_sales([1, 1, 2, 3]).assign(**{"Адрес магазина": ["A", "B", "A", "B"]})
+    purchases = make_sales([1, 2, 2, 2]).assign(**{"Операция": "Поступление", "Цена руб./шт.": "20"})
+    return preprocess_data(pd.concat([sales, purchases], ignore_index=True))
+
+
+def test_grouped_inventory_insights_use_group_stats_instead_of_summary():
+    analysis = analyze_inventory_turnover(make_inventory(), top_n=None, group_by=["Адрес магазина"])
+    insights = get_inventory_insights(analysis, top_n=1, group_by=["Адрес магазина"])
+
+    assert "summary_stats" not in insights
+    assert insights["group_stats"]["Товаров"].sum() == len(analysis)
+    assert insights["most_profitable"].groupby("Адрес магазина").size().max() == 1
+
+
+def test_build_reports_exports_classified_catalog_once(tmp_path):
+    saved = export_reports(build_reports(make_inventory()), tmp_path, "csv")
+
+    assert [name for name in saved if name.endswith("classified")] == ["inventory_classified"]
+    # Таблица движения товаров входит в inventory_classified и отдельно не пишется
+    assert "inventory_turnover" not in saved
+    assert [name for name in saved if name.endswith("summary_stats")] == ["inventory_summary_stats"]
+
+
+def test_sketch_sales_files_skips_empty_file(tmp_path, capsys):
+    empty = tmp_path / "empty.csv"
+    empty.write_text("")
+    valid = tmp_path / "valid.csv"
+    make_sales([1, 2, 3]).to_csv(valid, sep=";", index=False)
+
+    unique_sketches, top_sketch = sketch_sales_files([empty, valid])
+    assert "empty.csv" in capsys.readouterr().out
+    assert top_sketch.total == 3
+
+
+def make_catalog_sales():
+    return generate_sales_data(50_000, 8_000, 4, seed=3)
+
+
+def test_aggregate_sales_by_category_approx_matches_exact_within_error():
+    data = make_catalog_sales()
+    exact = aggregate_sales_by_category(data)
+    approx = aggregate_sales_by_category(data, approx=True, error=0.02)
+
+    assert approx.index.tolist() == exact.index.tolist()
+    assert approx['Выручка'].equals(exact['Выручка'])
+    relative = (approx['Уникальных товаров'] - exact['Уникальных товаров']).abs() / exact['Уникальных товаров']
+    # 3 стандартных отклонения от заданной ошибки
+    assert (relative <= 3 * 0.02).all()
+
+
+def test_get_top_n_products_approx_matches_exact_within_error():
+    data = make_catalog_sales()
+    for metric, column in (('quantity', 'Количество упаковок, шт.'), ('revenue', 'Сумма операции')):
+        exact = get_top_n_products(data, 5, metric)
+        approx = get_top_n_products(data, 5, metric, approx=True, error=0.01)
+
+        assert approx.columns.tolist() == exact.columns.tolist()
+        assert approx['Название товара'].tolist() == exact['Название товара'].tolist()
+        # Оценка Space-Saving завышена не более чем на error * общий вес
+        difference = approx.iloc[:, 1] - exact.iloc[:, 1]
+        assert (difference >= -1e-6).all()
+        assert (difference <= 0.01 * data[column].sum()).all()
+
+
+# Каталог с заранее посчитанными ответами. Среднее продаж по всему каталогу 6 (порог 1.8),
+# в магазине A - 4 (порог 1.2), в магазине B - 8 (порог 2.4)
+def make_inventory_analysis():
+    return pd.DataFrame({
+        "Адрес магазина": ["A", "A", "A", "B", "B", "B"],
+        "Артикул": [1, 2, 3, 4, 5, 6],
+        "Название товара": ["Т1", "Т2", "Т3", "Т4", "Т5", "Т6"],
+        "Продано_упаковок": [10, 0, 2, 8, 8, 8],
+        "Поступлено_упаковок": [0, 10, 2, 5, 10, 8],
+        "Разница_упаковок": [10, -10, 0, 3, -2, 0],
+        "Выручка_от_продаж": [100.0, 0.0, 20.0, 80.0, 80.0, 85.0],
+        "Затраты_на_закупки": [0.0, 50.0, 20.0, 50.0, 90.0, 80.0],
+        "Прибыль": [100.0, -50.0, 0.0, 30.0, -10.0, 5.0],
+        "Рентабельность_%": [None, -100.0, 0.0, 60.0, -11.11, 6.25],
+    })
+
+
+def articles(table, column):
+    return table.loc[table[column], "Артикул"].tolist()
+
+
+def test_inventory_insights_classify_whole_catalog():
+    insights = get_inventory_insights(make_inventory_analysis(), top_n=1)
+    classified = insights["classified"]
+
+    # Маски и порог считаются по всем 6 товарам, а не только по top_n
+    assert len(classified) == 6
+    assert articles(classified, "Дефицит") == [1, 4]
+    assert articles(classified, "Излишек") == [2, 5]
+    assert articles(classified, "Прибыльный") == [1, 4, 6]
+    assert articles(classified, "Убыточный") == [2, 5]
+    assert classified["Место_по_прибыли"].tolist() == [1, 6, 4, 2, 5, 3]
+    assert classified["Место_с_конца"].tolist() == [6, 1, 3, 5, 2, 4]
+
+    assert insights["overstock_candidates"]["Артикул"].tolist() == [1, 4]
+    assert insights["understock_candidates"]["Артикул"].tolist() == [2, 5]
+    assert insights["most_profitable"]["Артикул"].tolist() == [1]
+    assert insights["least_profitable"]["Артикул"].tolist() == [2]
+    stats = insights["summary_stats"]
+    assert (stats["total_items"], stats["items_with_deficit"], stats["items_with_excess"]) == (6, 2, 2)
+    assert (stats["profitable_items"], stats["loss_making_items"]) == (3, 2)
+
+
+def test_inventory_insights_rank_within_store():
+    insights = get_inventory_insights(make_inventory_analysis(), top_n=1, group_by=["Адрес магазина"])
+    classified = insights["classified"]
+
+    # В магазине B порог выше (2.4), поэтому артикул 5 с разницей -2 уже не излишек
+    assert articles(classified, "Дефицит") == [1, 4]
+    assert articles(classified, "Излишек") == [2]
+    assert classified["Место_по_прибыли"].tolist() == [1, 3, 2, 1, 3, 2]
+    assert classified["Место_с_конца"].tolist() == [3, 1, 2, 3, 1, 2]
+
+    assert insights["most_profitable"]["Артикул"].tolist() == [1, 4]
+    assert insights["least_profitable"]["Артикул"].tolist() == [2, 5]
+    group_stats = insights["group_stats"].set_index("Адрес магазина")
+    assert group_stats.loc["A", ["Дефицит", "Излишек", "Прибыльных", "Убыточных"]].tolist() == [1, 1, 1, 1]
+    assert group_stats.loc["B", ["Дефицит", "Излишек", "Прибыльных", "Убыточных"]].tolist() == [1, 0, 2, 1]
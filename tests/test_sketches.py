@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import HyperLogLog, SpaceSaving, _bit_length, group_hyperloglogs, hash_values
+
+
+def test_hash_values_ignores_integral_float_dtype():
+    assert (hash_values(np.arange(100)) == hash_values(np.arange(100.0))).all()
+
+
+def test_hyperloglog_merges_int_and_float_chunks():
+    int_chunk = HyperLogLog().update(np.arange(500))
+    # Пропуск в колонке делает её float64, артикулы при этом те же
+    float_chunk = HyperLogLog().update(np.append(np.arange(500.0), np.nan))
+    merged = int_chunk.merge(float_chunk).count()
+    assert abs(merged - 500) <= 500 * 3 * int_chunk.error
+
+
+def test_bit_length_matches_python():
+    values = np.array([0, 1, 2, 3, 255, 256, 2 ** 53 - 1, 2 ** 63, 2 ** 64 - 1], dtype=np.uint64)
+    assert _bit_length(values).tolist() == [int(value).bit_length() for value in values]
+
+
+def test_hyperloglog_error_bound():
+    for error in (0.05, 0.01):
+        sketch = HyperLogLog(error)
+        assert sketch.error <= error
+        estimate = sketch.update(np.arange(100_000)).count()
+        assert abs(estimate - 100_000) <= 100_000 * 3 * sketch.error
+
+
+def test_hyperloglog_merge_of_halves_equals_whole():
+    whole = HyperLogLog().update(np.arange(20_000))
+    halves = HyperLogLog().update(np.arange(10_000)).merge(HyperLogLog().update(np.arange(10_000, 20_000)))
+    assert (whole.registers == halves.registers).all()
+
+
+def test_hyperloglog_rejects_unreachable_error():
+    for error in (0, -0.1, 0.001):
+        with pytest.raises(ValueError):
+            HyperLogLog(error)
+    with pytest.raises(ValueError):
+        HyperLogLog().merge(HyperLogLog(0.05))
+
+
+def test_space_saving_finds_heavy_hitters_within_bound():
+    rng = np.random.default_rng(0)
+    keys = rng.zipf(1.5, 200_000) % 10_000
+    sketch = SpaceSaving(0.01)
+    for start in range(0, len(keys), 10_000):
+        sketch.update(keys[start:start + 10_000])
+    exact = pd.Series(keys).value_counts()
+    top = sketch.top(5)
+    assert top['key'].tolist() == exact.index[:5].tolist()
+    for key, count, error in top.itertuples(index=False):
+        assert count - error <= exact[key] <= count
+        assert count - exact[key] <= 0.01 * len(keys)
+
+
+def test_space_saving_merge_across_files():
+    first = SpaceSaving(capacity=3).update(['a', 'a', 'b', 'c', 'd'])
+    second = SpaceSaving(capacity=3).update(['a', 'e', 'e', 'e'])
+    merged = first.merge(second)
+    exact = {'a': 3, 'e': 3}
+    top = merged.top(2)
+    assert set(top['key']) == set(exact)
+    for key, count, error in top.itertuples(index=False):
+        assert count - error <= exact[key] <= count
+    assert merged.total == 9
+
+
+def test_space_saving_rejects_invalid_error():
+    for error in (0, -1, 2):
+        with pytest.raises(ValueError):
+            SpaceSaving(error)
+    with pytest.raises(ValueError):
+        SpaceSaving(capacity=0)
+
+
+def test_hash_values_hashes_numbers_without_strings():
+    assert (hash_values(np.arange(10, dtype=np.int32)) == hash_values(np.arange(10))).all()
+    assert (hash_values(pd.Series(['1', '2'])) == hash_values(['1', '2'])).all()
+
+
+def test_group_hyperloglogs_matches_per_group_updates():
+    rng = np.random.default_rng(1)
+    groups = rng.integers(0, 3, 30_000)
+    values = rng.integers(0, 5_000, 30_000)
+    sketches = group_hyperloglogs(groups, values, 0.02)
+    for group in range(3):
+        single = HyperLogLog(0.02).update(values[groups == group])
+        assert (sketches[group].registers == single.registers).all()